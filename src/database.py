@@ -1,4 +1,6 @@
 import json
+from collections import Counter
+from typing import Iterator
 from uuid import UUID, uuid4
 
 import psycopg2
@@ -52,6 +54,21 @@ class Database:
             cursor.execute("TRUNCATE TABLE reference_samples")
             self.connection.commit()
 
+    @staticmethod
+    def _parse_reference_sample(data) -> ReferenceSample:
+        order_1: list[list[str]] = [part.split(",") for part in data[2].split(";")]
+        order_2: list[list[str]] = [part.split(",") for part in data[3].split(";")]
+        order_3: list[list[str]] = [part.split(",") for part in data[4].split(";")]
+        return ReferenceSample(
+            data[0],
+            data[1],
+            order_1,
+            order_2,
+            order_3,
+            data[5],
+            data[6],
+        )
+
     def get_reference_samples(self, theme: str) -> list[ReferenceSample]:
         result = []
         with self.connection.cursor() as cursor:
@@ -61,26 +78,57 @@ class Database:
 
             raw_data = cursor.fetchall()
             for data in raw_data:
-                order_1: list[list[str]] = [
-                    part.split(",") for part in data[2].split(";")
-                ]
-                order_2: list[list[str]] = [
-                    part.split(",") for part in data[3].split(";")
-                ]
-                order_3: list[list[str]] = [
-                    part.split(",") for part in data[4].split(";")
-                ]
-                result.append(
-                    ReferenceSample(
-                        data[0],
-                        data[1],
-                        order_1,
-                        order_2,
-                        order_3,
-                        data[5],
-                        data[6],
-                    )
+                result.append(self._parse_reference_sample(data))
+        return result
+
+    def iter_order_signature_chunks(
+        self, theme: str, order: str, chunk_size: int
+    ) -> Iterator[Counter[tuple[str, ...]]]:
+        """
+        Читает уникальные сигнатуры предложений одного порядка для темы через именованный
+        (серверный) курсор порциями по chunk_size записей. Повторы сворачиваются в базе,
+        поэтому каждая сигнатура встречается ровно в одной порции вместе с количеством повторов,
+        а в памяти одновременно находится не больше одной порции.
+
+        Курсор живет внутри текущей транзакции, поэтому генератор нужно дочитать
+        до вызова commit (например, до insert_new_samples).
+        """
+        if order not in ("order1", "order2", "order3"):
+            raise ValueError(f"Unknown order: {order}")
+        with self.connection.cursor(name=f"reference_samples_{uuid4().hex}") as cursor:
+            query = f"SELECT sentence, count(*) FROM reference_samples, unnest(string_to_array({order}, ';')) AS sentence WHERE theme=%(theme)s GROUP BY sentence"
+            params = {"theme": theme}
+            cursor.execute(query, params)
+
+            while raw_data := cursor.fetchmany(chunk_size):
+                yield Counter(
+                    {tuple(sentence.split(",")): count for sentence, count in raw_data}
+                )
+
+    def get_duplication_stats(self) -> dict[str, dict[str, tuple[int, int]]]:
+        """
+        Считает для каждой темы общее и уникальное количество эталонных строк
+        и сигнатур предложений каждого порядка. Строки без темы пропускаются,
+        так как при сравнении они не используются.
+
+        Возвращает:
+        - dict: {тема: {"rows" | "order1" | "order2" | "order3": (всего, уникальных)}}.
+        """
+        result: dict[str, dict[str, tuple[int, int]]] = {}
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT theme, count(*), count(DISTINCT (order1, order2, order3)) FROM reference_samples WHERE theme IS NOT NULL GROUP BY theme"
+            )
+            for theme, total, unique in cursor.fetchall():
+                result[theme] = {"rows": (total, unique)}
+            for order in ("order1", "order2", "order3"):
+                cursor.execute(
+                    f"SELECT theme, count(*), count(DISTINCT sentence) FROM reference_samples, unnest(string_to_array({order}, ';')) AS sentence WHERE theme IS NOT NULL GROUP BY theme"
                 )
+                # Запросы видят разные снимки, тема могла появиться между ними
+                for theme, total, unique in cursor.fetchall():
+                    result.setdefault(theme, {})[order] = (total, unique)
+        self.connection.commit()
         return result
 
     def dump_json(self, file_name):
@@ -0,0 +1,322 @@
+# Генератор нагрузки для конвейера texts_analysis -> analyses_results
+import argparse
+import json
+import math
+import os
+import random
+import time
+import uuid
+
+import pika
+from database import Database
+from dotenv import load_dotenv
+
+WORDS = [
+    "анализ",
+    "текст",
+    "система",
+    "данные",
+    "модель",
+    "процесс",
+    "результат",
+    "задача",
+    "решение",
+    "метод",
+    "работа",
+    "программа",
+    "проект",
+    "сервер",
+    "очередь",
+    "сообщение",
+    "запрос",
+    "ответ",
+    "пользователь",
+    "документ",
+    "получать",
+    "отправлять",
+    "обрабатывать",
+    "сохранять",
+    "проверять",
+    "строить",
+    "выполнять",
+    "определять",
+    "быстрый",
+    "новый",
+    "большой",
+    "важный",
+]
+
+
+class PendingMessage:
+    def __init__(self, id: str, label: str, sent_at: float):
+        self.id = id
+        self.label = label
+        self.sent_at = sent_at
+
+
+def generate_text(sentences: int, words_per_sentence=8) -> str:
+    """
+    Генерирует случайный русский текст из заданного количества предложений.
+
+    Параметры:
+    - sentences (int): Количество предложений в тексте.
+    - words_per_sentence (int): Количество слов в одном предложении.
+
+    Возвращает:
+    - str: Сгенерированный текст.
+    """
+    result = []
+    for _ in range(sentences):
+        words = random.choices(WORDS, k=words_per_sentence)
+        result.append(" ".join(words).capitalize() + ".")
+    return " ".join(result)
+
+
+def generate_message(args) -> tuple[str, list[dict]]:
+    """
+    Формирует тело сообщения для очереди texts_analysis в формате, который ожидает read_data_from_json.
+
+    Возвращает:
+    - tuple: Идентификатор текста и список словарей для сериализации в json.
+    """
+    theme = f"{args.theme_prefix}_{random.randrange(args.themes)}"
+    label = random.choice(["0", "1"]) if random.random() < args.labeled_ratio else "?"
+    text_id = str(uuid.uuid4())
+    payload = [
+        {
+            "id": text_id,
+            "text": generate_text(args.sentences),
+            "label": label,
+            "theme": theme,
+        }
+    ]
+    return text_id, payload
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """
+    Возвращает перцентиль методом ближайшего ранга.
+
+    Пример использования:
+    >>> percentile([1, 2, 3, 4], 50)
+    2
+    """
+    if not values:
+        return 0
+    ordered = sorted(values)
+    rank = max(math.ceil(len(ordered) * percent / 100) - 1, 0)
+    return ordered[rank]
+
+
+def format_latencies(latencies: list[float]) -> str:
+    return "p50={:.3f}s p95={:.3f}s p99={:.3f}s".format(
+        percentile(latencies, 50),
+        percentile(latencies, 95),
+        percentile(latencies, 99),
+    )
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(
+            f"ожидается целое число >= 1, получено {value}"
+        )
+    return number
+
+
+def parse_args():
+    load_dotenv()
+    parser = argparse.ArgumentParser(
+        description="Нагрузочное тестирование анализатора через RabbitMQ и Postgres"
+    )
+    parser.add_argument("--mq-host", default="localhost")
+    parser.add_argument("--db-host", default="localhost")
+    parser.add_argument(
+        "--db-port", type=int, default=int(os.getenv("DB_PORT", "5432"))
+    )
+    parser.add_argument("--db-user", default=os.getenv("DB_USER", "postgres"))
+    parser.add_argument("--db-password", default=os.getenv("DB_PASSWORD", "password"))
+    parser.add_argument("--db-name", default=os.getenv("DB_NAME", "postgres"))
+    parser.add_argument(
+        "--messages", type=positive_int, default=100, help="Количество сообщений"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Сообщений в секунду (открытый цикл); 0 - использовать --concurrency",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=positive_int,
+        default=1,
+        help="Количество одновременно обрабатываемых сообщений (закрытый цикл)",
+    )
+    parser.add_argument(
+        "--labeled-ratio",
+        type=float,
+        default=0.5,
+        help="Доля размеченных сообщений (label 0/1), остальные отправляются с '?'",
+    )
+    parser.add_argument(
+        "--sentences",
+        type=positive_int,
+        default=10,
+        help="Количество предложений в тексте",
+    )
+    parser.add_argument("--themes", type=positive_int, default=1, help="Количество тем")
+    parser.add_argument("--theme-prefix", default="loadtest")
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.05,
+        help="Интервал опроса базы на появление записей, секунд",
+    )
+    parser.add_argument(
+        "--message-timeout",
+        type=float,
+        default=120,
+        help="Через сколько секунд необработанное сообщение считается потерянным (timed_out)",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=300,
+        help="Сколько ждать обработки оставшихся сообщений после отправки, секунд",
+    )
+    parser.add_argument(
+        "--cleanup",
+        action="store_true",
+        help="Удалить записи тестовых тем из reference_samples после прогона",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args()
+
+
+def run(args):
+    random.seed(args.seed)
+    db = Database(
+        args.db_user, args.db_password, args.db_name, args.db_host, args.db_port
+    )
+    connection = pika.BlockingConnection(
+        pika.ConnectionParameters(host=args.mq_host, heartbeat=900)
+    )
+    channel = connection.channel()
+    queue_name = channel.queue_declare("texts_analysis").method.queue
+    result_queue_name = channel.queue_declare("analyses_results").method.queue
+    replicas = channel.queue_declare(queue_name, passive=True).method.consumer_count
+
+    pending: dict[str, PendingMessage] = {}
+    latencies: dict[str, list[float]] = {"labeled": [], "undefined": []}
+    results_received = 0
+    timed_out = 0
+
+    def complete(text_id: str, finished_at: float):
+        message = pending.pop(text_id, None)
+        if message is None:
+            return
+        kind = "undefined" if message.label == "?" else "labeled"
+        latencies[kind].append(finished_at - message.sent_at)
+
+    def expire(now: float):
+        # Сообщения, которые не обработаны за message_timeout, освобождают место
+        # в закрытом цикле и учитываются как потерянные
+        nonlocal timed_out
+        for text_id, message in list(pending.items()):
+            if now - message.sent_at > args.message_timeout:
+                del pending[text_id]
+                timed_out += 1
+
+    def on_result(ch, method, properties, body):
+        nonlocal results_received
+        finished_at = time.monotonic()
+        for result in json.loads(body):
+            if result["id"] in pending:
+                results_received += 1
+                complete(result["id"], finished_at)
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+
+    def poll_database():
+        # Результат в analyses_results публикуется только для целевых фрагментов,
+        # поэтому завершение обработки определяем по записи текста в базе
+        if not pending:
+            return
+        with db.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT DISTINCT id FROM reference_samples WHERE id = ANY(%s::uuid[])",
+                (list(pending),),
+            )
+            finished_at = time.monotonic()
+            for (text_id,) in cursor.fetchall():
+                complete(str(text_id), finished_at)
+        db.connection.commit()
+
+    def publish():
+        text_id, payload = generate_message(args)
+        pending[text_id] = PendingMessage(
+            text_id, payload[0]["label"], time.monotonic()
+        )
+        channel.basic_publish(
+            exchange="",
+            routing_key=queue_name,
+            body=json.dumps(payload, ensure_ascii=False),
+        )
+
+    channel.basic_consume(on_message_callback=on_result, queue=result_queue_name)
+
+    sent = 0
+    started_at = time.monotonic()
+    last_poll = 0.0
+    while sent < args.messages:
+        now = time.monotonic()
+        if args.rate > 0:
+            due = min(int((now - started_at) * args.rate) + 1, args.messages)
+        else:
+            due = min(sent + args.concurrency - len(pending), args.messages)
+        while sent < due:
+            publish()
+            sent += 1
+        connection.process_data_events(time_limit=0)
+        if now - last_poll >= args.poll_interval:
+            poll_database()
+            last_poll = now
+        expire(now)
+        time.sleep(min(args.poll_interval, 1 / args.rate if args.rate > 0 else 1))
+
+    deadline = time.monotonic() + args.drain_timeout
+    while pending and time.monotonic() < deadline:
+        connection.process_data_events(time_limit=args.poll_interval)
+        poll_database()
+        expire(time.monotonic())
+    elapsed = time.monotonic() - started_at
+    timed_out += len(pending)
+
+    all_latencies = latencies["labeled"] + latencies["undefined"]
+    mode = f"rate={args.rate}/s" if args.rate > 0 else f"concurrency={args.concurrency}"
+    print(
+        f"replicas={replicas} {mode} messages={args.messages} "
+        f"sentences={args.sentences} themes={args.themes} labeled_ratio={args.labeled_ratio}"
+    )
+    print(
+        f"completed={len(all_latencies)} timed_out={timed_out} "
+        f"results_received={results_received} elapsed={elapsed:.2f}s "
+        f"throughput={len(all_latencies) / elapsed:.2f} msg/s"
+    )
+    print(f"all:       {format_latencies(all_latencies)}")
+    print(f"labeled:   {format_latencies(latencies['labeled'])}")
+    print(f"undefined: {format_latencies(latencies['undefined'])}")
+
+    if args.cleanup:
+        with db.connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM reference_samples WHERE theme LIKE %s",
+                (f"{args.theme_prefix}\\_%",),
+            )
+        db.connection.commit()
+
+    connection.close()
+
+
+if __name__ == "__main__":
+    run(parse_args())
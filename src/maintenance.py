@@ -0,0 +1,47 @@
+# Служебные команды для обслуживания базы эталонов
+import argparse
+import os
+
+from database import Database
+from dotenv import load_dotenv
+
+
+def report_duplication(db: Database):
+    """
+    Выводит для каждой темы долю повторяющихся эталонных строк и сигнатур предложений по порядкам.
+
+    Доля повторов считается как 1 - уникальных / всего.
+    """
+    stats = db.get_duplication_stats()
+    columns = ["rows", "order1", "order2", "order3"]
+    print(f"{'theme':<30}" + "".join(f"{column:>24}" for column in columns))
+    for theme, theme_stats in sorted(stats.items()):
+        line = f"{theme:<30}"
+        for column in columns:
+            total, unique = theme_stats.get(column, (0, 0))
+            ratio = 1 - unique / total if total else 0
+            line += f"{f'{unique}/{total} ({ratio:.1%})':>24}"
+        print(line)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Обслуживание базы эталонов")
+    parser.add_argument("--db-host", default=os.getenv("DB_HOST", "postgres"))
+    parser.add_argument(
+        "--db-port", type=int, default=int(os.getenv("DB_PORT", "5432"))
+    )
+    parser.add_argument("--db-user", default=os.getenv("DB_USER", "postgres"))
+    parser.add_argument("--db-password", default=os.getenv("DB_PASSWORD", "password"))
+    parser.add_argument("--db-name", default=os.getenv("DB_NAME", "postgres"))
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser(
+        "duplication", help="Доля повторяющихся сигнатур эталонов по темам"
+    )
+    args = parser.parse_args()
+
+    db = Database(
+        args.db_user, args.db_password, args.db_name, args.db_host, args.db_port
+    )
+    if args.command == "duplication":
+        report_duplication(db)
@@ -4,7 +4,10 @@ import logging
 import os
 import re
 import uuid
+from collections import Counter
 from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import Iterable, Sequence
 
 import pika
 import pymorphy2
@@ -298,45 +301,90 @@ def get_text_id(fragment_id, text_id_length=6):
     return fragment_id[:text_id_length]
 
 
-def find_max_order_weight(undefined_fragment_order, etalon_text_fragment_orders):
+def find_max_order_weight(
+    undefined_fragment_order: list[list[str]],
+    etalon_signatures: Iterable[Sequence[str]],
+):
+    """
+    Находит максимальный вес совпадения сигнатур предложений фрагмента с сигнатурами эталонов одного порядка.
+
+    Параметры:
+    - undefined_fragment_order (list): Сигнатуры предложений неопределенного фрагмента одного порядка.
+    - etalon_signatures (Iterable): Уникальные сигнатуры предложений эталонов того же порядка,
+      например ключи результата collapse_order_signatures. Вес - максимум по парам,
+      поэтому количество повторов сигнатуры на результат не влияет и сюда не передается.
+
+    Возвращает:
+    - float: Максимальный вес совпадения от 0 до 1.
+    """
     max_weight = 0
     for undefined_fragment in undefined_fragment_order:
-        for etalon_fragment_order in etalon_text_fragment_orders:
-            for etalon_fragment in etalon_fragment_order:
-                current_pair = compare_signatures(undefined_fragment, etalon_fragment)
-                try:
-                    current_weight = current_pair[0] / current_pair[1]
-                except ZeroDivisionError:
-                    current_weight = 0
-                if max_weight < current_weight:
-                    max_weight = current_weight
+        for etalon_fragment in etalon_signatures:
+            current_pair = compare_signatures(undefined_fragment, etalon_fragment)
+            try:
+                current_weight = current_pair[0] / current_pair[1]
+            except ZeroDivisionError:
+                current_weight = 0
+            if max_weight < current_weight:
+                max_weight = current_weight
     max_weight = 1 if max_weight > 1 else max_weight
     return max_weight
 
 
+def collapse_order_signatures(
+    etalon_orders: Iterable[list[list[str]]],
+) -> Counter[tuple[str, ...]]:
+    """
+    Сворачивает одинаковые сигнатуры предложений одного порядка в одну каноническую запись со счетчиком ссылок.
+
+    Параметры:
+    - etalon_orders (Iterable): Сигнатуры одного порядка для эталонных фрагментов темы.
+
+    Возвращает:
+    - Counter: Уникальные сигнатуры предложений и количество их повторений.
+      Для сравнения используются только ключи (см. find_max_order_weight).
+
+    Пример использования:
+    >>> collapse_order_signatures([[['это', 'предложение']], [['это', 'предложение'], ['еще']]])
+    Counter({('это', 'предложение'): 2, ('еще',): 1})
+    """
+    return Counter(
+        tuple(etalon_fragment)
+        for etalon_fragment_order in etalon_orders
+        for etalon_fragment in etalon_fragment_order
+    )
+
+
 def check_text_fragments_for_similarity(
     undefined_text_fragments: list[ReferenceSample],
     etalon_text_fragments: list[ReferenceSample],
 ):
-    etalon_order_1 = [etalon.order1 for etalon in etalon_text_fragments]
-    etalon_order_2 = [etalon.order2 for etalon in etalon_text_fragments]
-    etalon_order_3 = [etalon.order3 for etalon in etalon_text_fragments]
+    # Одинаковые сигнатуры предложений эталонов сравниваются только один раз
+    etalon_signatures_1 = list(
+        collapse_order_signatures(etalon.order1 for etalon in etalon_text_fragments)
+    )
+    etalon_signatures_2 = list(
+        collapse_order_signatures(etalon.order2 for etalon in etalon_text_fragments)
+    )
+    etalon_signatures_3 = list(
+        collapse_order_signatures(etalon.order3 for etalon in etalon_text_fragments)
+    )
     for i in range(len(undefined_text_fragments)):
         with ProcessPoolExecutor(max_workers=3) as executor:
             max_weight_order_1_future = executor.submit(
                 find_max_order_weight,
                 undefined_text_fragments[i].order1,
-                etalon_order_1,
+                etalon_signatures_1,
             )
             max_weight_order_2_future = executor.submit(
                 find_max_order_weight,
                 undefined_text_fragments[i].order2,
-                etalon_order_2,
+                etalon_signatures_2,
             )
             max_weight_order_3_future = executor.submit(
                 find_max_order_weight,
                 undefined_text_fragments[i].order3,
-                etalon_order_3,
+                etalon_signatures_3,
             )
             weight_order_1 = max_weight_order_1_future.result()
             weight_order_2 = max_weight_order_2_future.result()
@@ -346,6 +394,44 @@ def check_text_fragments_for_similarity(
         ) / 6
 
 
+def check_text_fragments_for_similarity_chunked(
+    undefined_text_fragments: list[ReferenceSample],
+    order_signature_chunks: list[Iterable[Counter[tuple[str, ...]]]],
+):
+    """
+    Определяет веса неопределенных фрагментов, получая уникальные сигнатуры эталонов порциями.
+
+    Для каждого фрагмента хранятся текущие максимумы по трем порядкам, поэтому
+    пиковая память ограничена размером одной порции сигнатур, а не всей темы.
+
+    Параметры:
+    - undefined_text_fragments (list): Фрагменты, для которых вычисляется вес.
+    - order_signature_chunks (list): Три последовательности порций уникальных сигнатур,
+      по одной для каждого порядка (например, из Database.iter_order_signature_chunks).
+    """
+    if not undefined_text_fragments:
+        return
+    max_weights = [[0, 0, 0] for _ in undefined_text_fragments]
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        for order, signature_chunks in enumerate(order_signature_chunks):
+            for signature_chunk in signature_chunks:
+                etalon_signatures = list(signature_chunk)
+                futures = [
+                    executor.submit(
+                        find_max_order_weight,
+                        (fragment.order1, fragment.order2, fragment.order3)[order],
+                        etalon_signatures,
+                    )
+                    for fragment in undefined_text_fragments
+                ]
+                for i, future in enumerate(futures):
+                    max_weights[i][order] = max(max_weights[i][order], future.result())
+    for fragment, (weight_order_1, weight_order_2, weight_order_3) in zip(
+        undefined_text_fragments, max_weights
+    ):
+        fragment.weight = (3 * weight_order_1 + 2 * weight_order_2 + weight_order_3) / 6
+
+
 class InputData:
     def __init__(self, id: uuid.UUID, text: str, label: str, theme: str):
         self.id = id
@@ -403,7 +489,9 @@ def generate_text_fragments(
     return undefined_samples, predefined_samples
 
 
-def main_check(input_data: str, db: Database, similarity_border=0.1, max_series=5):
+def main_check(
+    input_data: str, db: Database, similarity_border=0.1, max_series=5, chunk_size=0
+):
     """
     Основная функция для проверки схожести фрагментов текста с эталонами и обновления базы данных.
 
@@ -412,6 +500,7 @@ def main_check(input_data: str, db: Database, similarity_border=0.1, max_series=
     - db (str): Обертка над Postgres клиентом.
     - similarity_border (float): Порог схожести для определения, является ли фрагмент текста целевым.
     - max_series (int): Максимальное количество предложений в одном фрагменте текста.
+    - chunk_size (int): Размер порции эталонов при чтении из базы; 0 - читать тему целиком.
     - id_legend (list): Список, содержащий два элемента - длину идентификатора текста и порядкового номера фрагмента.
 
     Возвращает:
@@ -437,11 +526,29 @@ def main_check(input_data: str, db: Database, similarity_border=0.1, max_series=
     elif len(undefined_text_fragments) > 0:
         theme = undefined_text_fragments[0].theme
 
-    # Объединяем данные эталонов с новыми эталонами
-    etalons_data = db.get_reference_samples(theme) + new_etalon_fragments
+    if chunk_size > 0:
+        # Читаем уникальные сигнатуры эталонов порциями по каждому порядку
+        # и добавляем новые эталоны последней порцией
+        order_signature_chunks = [
+            chain(
+                db.iter_order_signature_chunks(theme, order, chunk_size),
+                [
+                    collapse_order_signatures(
+                        getattr(etalon, order) for etalon in new_etalon_fragments
+                    )
+                ],
+            )
+            for order in ("order1", "order2", "order3")
+        ]
+        check_text_fragments_for_similarity_chunked(
+            undefined_text_fragments, order_signature_chunks
+        )
+    else:
+        # Объединяем данные эталонов с новыми эталонами
+        etalons_data = db.get_reference_samples(theme) + new_etalon_fragments
 
-    # Орпеделяем веса неопределенных фрагментов текстов
-    check_text_fragments_for_similarity(undefined_text_fragments, etalons_data)
+        # Орпеделяем веса неопределенных фрагментов текстов
+        check_text_fragments_for_similarity(undefined_text_fragments, etalons_data)
 
     # Собираем в один список новые эталонные фрагменты и взвешенные неопределенные тексты
     new_data = undefined_text_fragments + new_etalon_fragments
@@ -473,6 +580,7 @@ if __name__ == "__main__":
     similarity_border = (
         float(val) if (val := os.getenv("SIMILARITY_BORDER")) is not None else 0.7
     )
+    reference_chunk_size = int(val) if (val := os.getenv("REFERENCE_CHUNK_SIZE")) else 0
     # Настройка логера
 
     db = Database(db_user, db_password, db_name, db_host, db_port)
@@ -492,7 +600,9 @@ if __name__ == "__main__":
         payload = body.decode()
 
         # Прямо передаем строку JSON в функцию main_check
-        target_fragments = main_check(payload, db, similarity_border)
+        target_fragments = main_check(
+            payload, db, similarity_border, chunk_size=reference_chunk_size
+        )
         # Логирование результата обработки
         logger.info(target_fragments)
         if len(target_fragments) > 0: